@@ -1,34 +1,66 @@
+import argparse
 import asyncio
+import sys
 import time
 import psutil
 import statistics
 import tracemalloc
 import os
+from array import array
+
+# coap_common.py está en coap/, un nivel por encima de este script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import coap_common
 
 from aiocoap import *
 
 NUM_REQUESTS = 100
+CONCURRENCY = 64  # Solicitudes en vuelo simultáneamente (solo con --concurrent)
 RESOURCE_URI = "coap://127.0.0.1/hola"
 
-async def main():
+async def main(concurrent=False):
     protocol = await Context.create_client_context()
-    latencies = []
+    latencies = array('q')  # ns por solicitud completada
+    semaphore = asyncio.Semaphore(CONCURRENCY)
 
-    process = psutil.Process(os.getpid())
-    cpu_start = process.cpu_times()
-    io_start = process.io_counters()
-    tracemalloc.start()
+    # La URI se analiza una sola vez; cada solicitud reutiliza destino y ruta
+    template = Message(code=GET, uri=RESOURCE_URI)
 
-    for _ in range(NUM_REQUESTS):
-        request = Message(code=GET, uri=RESOURCE_URI)
-        start = time.perf_counter()
+    async def send_request():
+        request = Message(code=GET)
+        request.opt.uri_path = template.opt.uri_path
+        request.remote = template.remote
+        start = time.perf_counter_ns()
         try:
             response = await protocol.request(request).response
         except Exception as e:
             print(f"Error en solicitud: {e}")
-            continue
-        end = time.perf_counter()
-        latencies.append((end - start) * 1000)  # ms
+            return
+        latencies.append(time.perf_counter_ns() - start)
+
+    async def send_request_limited():
+        async with semaphore:
+            await send_request()
+
+    process = psutil.Process(os.getpid())
+    cpu_start = process.cpu_times()
+    io_start = process.io_counters()
+    tracemalloc.start()
+    rss_sampler = coap_common.RssSampler(process)
+    rss_sampler.start()
+
+    total_start = time.perf_counter()
+    if concurrent:
+        # aiocoap deja en cola (NSTART=1) las solicitudes a un mismo destino,
+        # así que el tiempo de cada una incluye esa espera: solo se informa
+        # del rendimiento
+        await asyncio.gather(*(send_request_limited() for _ in range(NUM_REQUESTS)))
+    else:
+        # Una solicitud tras otra: cada latencia es un viaje de ida y vuelta
+        for _ in range(NUM_REQUESTS):
+            await send_request()
+    total_time = time.perf_counter() - total_start
+    rss_sampler.stop()
 
     cpu_end = process.cpu_times()
     io_end = process.io_counters()
@@ -36,15 +68,40 @@ async def main():
     tracemalloc.stop()
 
     print("\n--- Resultados ---")
+    print(f"Modo: {f'concurrente ({CONCURRENCY} en vuelo)' if concurrent else 'secuencial'}")
     print(f"Número de solicitudes: {len(latencies)}")
-    print(f"Latencia media: {statistics.mean(latencies):.2f} ms")
-    print(f"Desviación estándar: {statistics.stdev(latencies):.2f} ms")
+    print(f"Tiempo total: {total_time:.2f} s")
+    print(f"Rendimiento: {len(latencies) / total_time:.2f} solicitudes/s")
+    if concurrent:
+        print("Latencia: no se mide en modo concurrente (incluye la espera en cola)")
+    else:
+        # Cortes cada 1 %: con NUM_REQUESTS = 100 muestras no tiene sentido ir más allá de p99
+        percentiles = statistics.quantiles(latencies, n=100)
+        print(f"Latencia media: {statistics.fmean(latencies) / 1e6:.2f} ms")
+        print(f"Desviación estándar: {statistics.stdev(latencies) / 1e6:.2f} ms")
+        print(f"Percentiles p50/p95/p99: {percentiles[49] / 1e6:.2f} / {percentiles[94] / 1e6:.2f} / "
+              f"{percentiles[98] / 1e6:.2f} ms")
     print(f"CPU modo usuario: {cpu_end.user - cpu_start.user:.2f} s")
     print(f"CPU modo sistema: {cpu_end.system - cpu_start.system:.2f} s")
     print(f"Lecturas de disco: {io_end.read_count - io_start.read_count}")
     print(f"Escrituras de disco: {io_end.write_count - io_start.write_count}")
     print(f"Memoria pico usada (Python): {peak / 1024:.2f} KB")
+    print(f"Memoria residente pico (RSS): {rss_sampler.peak / 1024:.2f} KB")
     print(f"Memoria residente total (RSS): {process.memory_info().rss / 1024:.2f} KB")
 
+    # Cierra el socket del contexto: cada repetición de --runs empieza limpia y
+    # el recolector no lo libera en mitad de una medición posterior
+    await protocol.shutdown()
+
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Cliente CoAP básico (benchmark)')
+    parser.add_argument('--concurrent', action='store_true',
+                        help=f'Mantener hasta {CONCURRENCY} solicitudes en vuelo (solo rendimiento, sin latencias)')
+    parser.add_argument('--runs', type=int, default=1,
+                        help='Repeticiones del benchmark sobre el mismo bucle de eventos')
+    args = parser.parse_args()
+
+    # Un único bucle de eventos (el más eficiente disponible) para todas las repeticiones
+    with asyncio.Runner(loop_factory=coap_common.event_loop_factory()) as runner:
+        for _ in range(args.runs):
+            runner.run(main(args.concurrent))
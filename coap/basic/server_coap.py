@@ -1,4 +1,11 @@
+import argparse
 import asyncio
+import os
+import sys
+
+# coap_common.py está en coap/, un nivel por encima de este script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import coap_common
 from aiocoap import resource, Message, Context
 from aiocoap.numbers.codes import Code
 
@@ -7,16 +14,30 @@ class HelloResource(resource.Resource):
         payload = b"Hola desde el servidor CoAP"
         return Message(code=Code.CONTENT, payload=payload)
 
-async def main():
+async def main(transports=None):
     # Crear el árbol de recursos
     root = resource.Site()
     root.add_resource(('hola',), HelloResource())
 
     # Crear el contexto del servidor
-    context = await Context.create_server_context(root, bind=('127.0.0.1', 5683))
+    context = await Context.create_server_context(root, bind=('127.0.0.1', 5683), transports=transports)
 
     # Mantener el servidor activo
     await asyncio.get_running_loop().create_future()
 
+def run_worker():
+    # Solo UDP: los transportes TCP/TLS no admiten varios procesos en el mismo puerto
+    coap_common.run(main(transports=["udp6"]))
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description='Servidor CoAP básico')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Procesos servidores en el mismo puerto (0 = uno por núcleo, solo Linux)')
+    args = parser.parse_args()
+    workers = args.workers or os.cpu_count()
+
+    if workers > 1 and sys.platform.startswith("linux"):
+        print(f"Servidor CoAP con {workers} procesos en coap://127.0.0.1:5683/hola")
+        coap_common.run_workers(run_worker, workers)
+    else:
+        coap_common.run(main())
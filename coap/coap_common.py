@@ -0,0 +1,87 @@
+"""
+Utilidades compartidas por los scripts CoAP
+
+Los scripts se ejecutan desde su propio directorio (coap/basic, coap/dtls...),
+así que cada uno añade coap/ a sys.path antes de importar este módulo.
+"""
+
+import asyncio
+import importlib
+import multiprocessing
+import signal
+import sys
+import threading
+
+# Bucles de eventos alternativos, por orden de preferencia
+FAST_LOOP_MODULES = ("uringcore", "uvloop")
+
+def event_loop_factory():
+    """Fábrica del bucle de eventos más eficiente disponible, para asyncio.Runner
+
+    Prueba uringcore (io_uring, Linux) y después uvloop. Devuelve None, es decir,
+    el bucle estándar de asyncio, en Windows o si ninguno está instalado o no
+    puede crear un bucle en este sistema (p. ej. un kernel sin io_uring).
+    """
+    if sys.platform == "win32":
+        return None
+    for module_name in FAST_LOOP_MODULES:
+        try:
+            module = importlib.import_module(module_name)
+            factory = getattr(module, "new_event_loop", None) or module.EventLoopPolicy().new_event_loop
+            # Un bucle de prueba detecta los fallos en tiempo de ejecución
+            factory().close()
+        except Exception:
+            continue
+        return factory
+    return None
+
+class RssSampler(threading.Thread):
+    """Muestrea la memoria residente (RSS) en segundo plano y guarda el pico,
+    para no leer /proc desde el bucle de solicitudes"""
+
+    def __init__(self, process, interval=0.01):
+        super().__init__(daemon=True)
+        self._process = process
+        self._interval = interval
+        self._stop_event = threading.Event()
+        self.peak = 0
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.peak = max(self.peak, self._process.memory_info().rss)
+            self._stop_event.wait(self._interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+def run(main):
+    """Ejecutar la corrutina main con el bucle de eventos más eficiente disponible"""
+    with asyncio.Runner(loop_factory=event_loop_factory()) as runner:
+        return runner.run(main)
+
+def run_workers(target, n):
+    """Lanzar n procesos que ejecutan target y esperar a que terminen (solo Linux)
+
+    Cada proceso abre su propio socket UDP en el mismo puerto; aiocoap activa
+    SO_REUSEPORT y el kernel elige el proceso con un hash de las direcciones y
+    puertos, así que cada socket cliente va siempre al mismo. Con Ctrl+C o
+    SIGTERM se terminan los procesos hijos para que no sigan ocupando el puerto.
+    """
+    mp = multiprocessing.get_context("fork")
+    processes = [mp.Process(target=target) for _ in range(n)]
+    for process in processes:
+        process.start()
+
+    # SIGTERM (kill, supervisores) sale por el mismo camino que Ctrl+C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
@@ -1,12 +1,24 @@
+import argparse
 import asyncio
+import os
+import sys
 import time
 import statistics
 import psutil
+from array import array
+
+# coap_common.py está en coap/, un nivel por encima de este script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import coap_common
 from aiocoap import *
 
-async def main():
-    NUM_REQUESTS = 100
-    latencias = []
+NUM_REQUESTS = 100
+CONCURRENCY = 64  # Solicitudes en vuelo simultáneamente (solo con --concurrent)
+PROBE_ATTEMPTS = 20  # Intentos de la solicitud de sondeo inicial
+PROBE_TIMEOUT = 0.5  # s
+
+async def main(concurrent=False):
+    latencias = array('q')  # ns por solicitud completada
 
     process = psutil.Process()
 
@@ -18,18 +30,53 @@ async def main():
 
     protocol = await Context.create_client_context()
 
-    await asyncio.sleep(1)  # Da tiempo a establecer el contexto
+    # La URI se analiza una sola vez; cada solicitud reutiliza destino y ruta
+    plantilla = Message(code=GET, uri='coap://127.0.0.1:5684/hola')
+
+    # Solicitud de sondeo: confirma que el contexto y el servidor están
+    # listos antes de empezar a medir (sin esperas fijas)
+    for _ in range(PROBE_ATTEMPTS):
+        try:
+            await asyncio.wait_for(protocol.request(plantilla.copy()).response, PROBE_TIMEOUT)
+            break
+        except Exception:
+            await asyncio.sleep(0.05)
+    else:
+        print("Aviso: el servidor no respondió al sondeo inicial")
+
+    semaphore = asyncio.Semaphore(CONCURRENCY)
 
-    for _ in range(NUM_REQUESTS):
-        request = Message(code=GET, uri='coap://127.0.0.1:5684/hola')
-        start = time.perf_counter()
+    async def enviar_solicitud():
+        request = Message(code=GET)
+        request.opt.uri_path = plantilla.opt.uri_path
+        request.remote = plantilla.remote
+        start = time.perf_counter_ns()
         try:
             response = await protocol.request(request).response
-            end = time.perf_counter()
-            latencias.append((end - start) * 1000)  # ms
+            latencias.append(time.perf_counter_ns() - start)
         except Exception as e:
             print("Error en la solicitud:", e)
 
+    async def enviar_solicitud_limitada():
+        async with semaphore:
+            await enviar_solicitud()
+
+    rss_sampler = coap_common.RssSampler(process)
+    rss_sampler.start()
+
+    inicio_total = time.perf_counter()
+    if concurrent:
+        # aiocoap deja en cola (NSTART=1) las solicitudes a un mismo destino,
+        # así que el tiempo de cada una incluye esa espera: solo se informa
+        # del rendimiento
+        await asyncio.gather(*(enviar_solicitud_limitada() for _ in range(NUM_REQUESTS)))
+    else:
+        # Una solicitud tras otra: cada latencia es un viaje de ida y vuelta
+        for _ in range(NUM_REQUESTS):
+            await enviar_solicitud()
+    tiempo_total = time.perf_counter() - inicio_total
+    rss_sampler.stop()
+
     # Medidas después de las solicitudes
     cpu_user_end = process.cpu_times().user
     cpu_sys_end = process.cpu_times().system
@@ -37,15 +84,40 @@ async def main():
     io_end = process.io_counters()
 
     print("\n--- Resultados ---")
+    print(f"Modo: {f'concurrente ({CONCURRENCY} en vuelo)' if concurrent else 'secuencial'}")
     print(f"Número de solicitudes: {len(latencias)}")
-    print(f"Latencia media: {statistics.mean(latencias):.2f} ms")
-    print(f"Desviación estándar: {statistics.stdev(latencias):.2f} ms")
+    print(f"Tiempo total: {tiempo_total:.2f} s")
+    print(f"Rendimiento: {len(latencias) / tiempo_total:.2f} solicitudes/s")
+    if concurrent:
+        print("Latencia: no se mide en modo concurrente (incluye la espera en cola)")
+    else:
+        # Cortes cada 1 %: con NUM_REQUESTS = 100 muestras no tiene sentido ir más allá de p99
+        percentiles = statistics.quantiles(latencias, n=100)
+        print(f"Latencia media: {statistics.fmean(latencias) / 1e6:.2f} ms")
+        print(f"Desviación estándar: {statistics.stdev(latencias) / 1e6:.2f} ms")
+        print(f"Percentiles p50/p95/p99: {percentiles[49] / 1e6:.2f} / {percentiles[94] / 1e6:.2f} / "
+              f"{percentiles[98] / 1e6:.2f} ms")
     print(f"CPU modo usuario: {cpu_user_end - cpu_user_start:.2f} s")
     print(f"CPU modo sistema: {cpu_sys_end - cpu_sys_start:.2f} s")
     print(f"Lecturas de disco: {io_end.read_count - io_start.read_count}")
     print(f"Escrituras de disco: {io_end.write_count - io_start.write_count}")
     print(f"Memoria pico usada (Python): {(mem_info_end.vms - mem_info_start.vms)/1024:.2f} KB")
+    print(f"Memoria residente pico (RSS): {rss_sampler.peak / 1024:.2f} KB")
     print(f"Memoria residente total (RSS): {mem_info_end.rss / 1024:.2f} KB")
 
+    # Cierra el socket del contexto: cada repetición de --runs empieza limpia y
+    # el recolector no lo libera en mitad de una medición posterior
+    await protocol.shutdown()
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description='Cliente CoAP sobre DTLS (benchmark)')
+    parser.add_argument('--concurrent', action='store_true',
+                        help=f'Mantener hasta {CONCURRENCY} solicitudes en vuelo (solo rendimiento, sin latencias)')
+    parser.add_argument('--runs', type=int, default=1,
+                        help='Repeticiones del benchmark sobre el mismo bucle de eventos')
+    args = parser.parse_args()
+
+    # Un único bucle de eventos (el más eficiente disponible) para todas las repeticiones
+    with asyncio.Runner(loop_factory=coap_common.event_loop_factory()) as runner:
+        for _ in range(args.runs):
+            runner.run(main(args.concurrent))
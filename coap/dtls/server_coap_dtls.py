@@ -1,4 +1,11 @@
+import argparse
 import asyncio
+import os
+import sys
+
+# coap_common.py está en coap/, un nivel por encima de este script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import coap_common
 from aiocoap import *
 from aiocoap.resource import Resource, Site
 import datetime
@@ -12,16 +19,31 @@ class HolaResource(Resource):
         payload = b"Hola desde el servidor CoAP"
         return Message(payload=payload)
 
-async def main():
+async def main(transports=None, announce=True):
     # Creamos el recurso y lo registramos
     root = Site()
     root.add_resource(['hola'], HolaResource())
 
     # Usamos el puerto 5684 como hace DTLS por convención
-    context = await Context.create_server_context(root, bind=('127.0.0.1', 5684))
+    context = await Context.create_server_context(root, bind=('127.0.0.1', 5684), transports=transports)
 
-    print(f"[{datetime.datetime.now()}] Servidor CoAP (DTLS simulado) escuchando en coap://127.0.0.1:5684/hola")
+    if announce:
+        print(f"[{datetime.datetime.now()}] Servidor CoAP (DTLS simulado) escuchando en coap://127.0.0.1:5684/hola")
     await asyncio.get_running_loop().create_future()  # Mantiene el servidor activo
 
+def run_worker():
+    # Solo UDP: los transportes TCP/TLS no admiten varios procesos en el mismo puerto
+    coap_common.run(main(transports=["udp6"], announce=False))
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description='Servidor CoAP (DTLS simulado)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Procesos servidores en el mismo puerto (0 = uno por núcleo, solo Linux)')
+    args = parser.parse_args()
+    workers = args.workers or os.cpu_count()
+
+    if workers > 1 and sys.platform.startswith("linux"):
+        print(f"[{datetime.datetime.now()}] Servidor CoAP (DTLS simulado) con {workers} procesos en coap://127.0.0.1:5684/hola")
+        coap_common.run_workers(run_worker, workers)
+    else:
+        coap_common.run(main())
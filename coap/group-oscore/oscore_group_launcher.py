@@ -4,35 +4,54 @@ Script de lanzamiento para OSCORE Group
 Facilita ejecutar servidor y cliente
 """
 
-import subprocess
+import asyncio
 import sys
-import time
-import threading
 import os
 
+import oscore_group_network_fixed as ogn
+
+# coap_common.py está en coap/, un nivel por encima de este script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import coap_common
+
 # Asegura que las rutas relativas funcionen correctamente
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
 
+async def run_server_and_client():
+    """Ejecutar servidor y cliente como tareas del mismo bucle de eventos"""
+    ready = asyncio.Event()
+    
+    print("Iniciando servidor OSCORE Group...")
+    server_task = asyncio.create_task(ogn.run_server(ready=ready))
+    ready_task = asyncio.create_task(ready.wait())
+    
+    # El cliente arranca en cuanto el servidor escucha (o si no pudo arrancar)
+    await asyncio.wait({server_task, ready_task}, return_when=asyncio.FIRST_COMPLETED)
+    ready_task.cancel()
+    
+    try:
+        if ready.is_set():
+            print("Iniciando cliente OSCORE Group...")
+            await ogn.run_client()
+        else:
+            print("Error en servidor: no se pudo iniciar")
+    finally:
+        server_task.cancel()
+        await asyncio.gather(server_task, return_exceptions=True)
+
 def run_server():
-    """Ejecutar servidor en hilo separado"""
+    """Ejecutar solo el servidor en este proceso"""
     print("Iniciando servidor OSCORE Group...")
     try:
-        subprocess.run([sys.executable, "oscore_group_network_fixed.py", "server"], check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"Error en servidor: {e}")
+        coap_common.run(ogn.run_server())
     except KeyboardInterrupt:
         print("Servidor detenido")
 
 def run_client():
-    """Ejecutar cliente después de una pausa"""
-    print("Esperando 3 segundos para que el servidor se inicie...")
-    time.sleep(3)
-    
+    """Ejecutar solo el cliente en este proceso"""
     print("Iniciando cliente OSCORE Group...")
     try:
-        subprocess.run([sys.executable, "oscore_group_network_fixed.py", "client"], check=True)
-    except subprocess.CalledProcessError as e:
-        print(f"Error en cliente: {e}")
+        coap_common.run(ogn.run_client())
     except KeyboardInterrupt:
         print("Cliente detenido")
 
@@ -49,16 +68,16 @@ def main():
     
     choice = input("Selecciona una opción (1-4): ").strip()
     
+    if choice in ("1", "2", "3"):
+        ogn.check_crypto_backend()
+    
     if choice == "1":
         print("\nIniciando servidor y cliente automáticamente...")
         print("El tráfico será visible en Wireshark en puerto 5683")
         print("Presiona Ctrl+C para detener")
         
-        server_thread = threading.Thread(target=run_server, daemon=True)
-        server_thread.start()
-        
         try:
-            run_client()
+            coap_common.run(run_server_and_client())
         except KeyboardInterrupt:
             print("\nDeteniendo todo...")
         
@@ -10,19 +10,51 @@ import sys
 import argparse
 import json
 import os
-import secrets
+import time
+import types
+import cbor2
+from collections import namedtuple
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
 from aiocoap import *
 from aiocoap.resource import Site, Resource
-from aiocoap.oscore import SimpleGroupContext, A128GCM, Ed25519, hashfunctions
+from aiocoap.oscore import SimpleGroupContext, A128GCM, Ed25519, hashfunctions, ProtectionInvalid
 from aiocoap.oscore_sitewrapper import OscoreSiteWrapper
 from aiocoap.credentials import CredentialsMap
 
+# coap_common.py está en coap/, un nivel por encima de este script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import coap_common
+
+class CachedTimeFormatter(logging.Formatter):
+    """Formatter que sólo llama a strftime cuando cambia el segundo"""
+    
+    _last_second = None
+    _last_text = ''
+    
+    def formatTime(self, record, datefmt=None):
+        second = int(record.created)
+        if second != self._last_second:
+            self._last_second = second
+            self._last_text = time.strftime(self.default_time_format, self.converter(second))
+        return self.default_msec_format % (self._last_text, record.msecs)
+
 # Configurar logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s: %(message)s')
+log_handler = logging.StreamHandler()
+log_handler.setFormatter(CachedTimeFormatter('%(asctime)s - %(levelname)s: %(message)s'))
+logging.basicConfig(level=logging.INFO, handlers=[log_handler])
 logger = logging.getLogger(__name__)
+# Trazas por request del servidor: silenciadas salvo con --verbose
+request_logger = logging.getLogger(f"{__name__}.requests")
+request_logger.setLevel(logging.WARNING)
+
+# Con OSCORE_DEBUG=1 los errores se registran con su traceback completo
+DEBUG = os.getenv("OSCORE_DEBUG") == "1"
 
-# Archivo para credenciales
-CREDENTIALS_FILE = "oscore_group_credentials.json"
+# Archivo para credenciales (CBOR: las claves se guardan como bytes)
+CREDENTIALS_FILE = "oscore_group_credentials.cbor"
+# Formato anterior (JSON con claves en hexadecimal), se migra automáticamente
+LEGACY_CREDENTIALS_FILE = "oscore_group_credentials.json"
 
 # Configuración del grupo (fija para que coincida entre ejecuciones)
 GROUP_CONFIG = {
@@ -33,6 +65,39 @@ GROUP_CONFIG = {
     'server_id': b"S1"
 }
 
+class CachedEd25519(Ed25519):
+    """Ed25519 que conserva las claves ya parseadas
+    
+    aiocoap reconstruye la clave desde sus bytes en cada firma y verificación;
+    cargar la privada cuesta tanto como la propia firma. Las claves del grupo
+    no cambian durante la ejecución, así que se parsean una sola vez.
+    """
+    
+    def __init__(self):
+        self._private_keys = {}
+        self._public_keys = {}
+    
+    def sign(self, body, aad, private_key):
+        key = self._private_keys.get(private_key)
+        if key is None:
+            key = self._private_keys[private_key] = Ed25519PrivateKey.from_private_bytes(private_key)
+        return key.sign(self._build_countersign_structure(body, aad))
+    
+    def verify(self, signature, body, aad, public_key):
+        key = self._public_keys.get(public_key)
+        if key is None:
+            key = self._public_keys[public_key] = Ed25519PublicKey.from_public_bytes(public_key)
+        try:
+            key.verify(signature, self._build_countersign_structure(body, aad))
+        except InvalidSignature:
+            raise ProtectionInvalid("Signature mismatch")
+
+# Algoritmos del grupo (se comparten entre contextos)
+ALG_AEAD = A128GCM()
+ALG_SIGNATURE = CachedEd25519()
+ALG_GROUP_ENC = ALG_AEAD
+HASHFUN = hashfunctions["sha256"]
+
 # ==================== GESTIÓN DE CREDENCIALES ====================
 
 def generate_and_save_credentials():
@@ -40,47 +105,64 @@ def generate_and_save_credentials():
     
     logger.info("🔑 Generando credenciales nuevas...")
     
-    # Algoritmos
-    alg_signature = Ed25519()
-    
     # Generar credenciales
-    gm_private_key, gm_cred = alg_signature.generate_with_ccs()
-    client_private_key, client_cred = alg_signature.generate_with_ccs()
-    server_private_key, server_cred = alg_signature.generate_with_ccs()
+    gm_private_key, gm_cred = ALG_SIGNATURE.generate_with_ccs()
+    client_private_key, client_cred = ALG_SIGNATURE.generate_with_ccs()
+    server_private_key, server_cred = ALG_SIGNATURE.generate_with_ccs()
     
     # Crear estructura para guardar
     credentials = {
         'group_manager': {
-            'private_key': gm_private_key.hex(),
-            'credential': gm_cred.hex()
+            'private_key': gm_private_key,
+            'credential': gm_cred
         },
         'client': {
-            'private_key': client_private_key.hex(),
-            'credential': client_cred.hex()
+            'private_key': client_private_key,
+            'credential': client_cred
         },
         'server': {
-            'private_key': server_private_key.hex(),
-            'credential': server_cred.hex()
+            'private_key': server_private_key,
+            'credential': server_cred
         }
     }
     
-    # Guardar en archivo
-    with open(CREDENTIALS_FILE, 'w') as f:
-        json.dump(credentials, f, indent=2)
+    save_credentials(credentials)
+    return credentials
+
+def save_credentials(credentials):
+    """Guardar credenciales (con claves en bytes) en formato CBOR"""
+    
+    with open(CREDENTIALS_FILE, 'wb') as f:
+        f.write(cbor2.dumps(credentials))
     
     logger.info(f"✅ Credenciales guardadas en {CREDENTIALS_FILE}")
-    return credentials
 
-def load_credentials():
-    """Cargar credenciales desde archivo"""
+def migrate_legacy_credentials():
+    """Convertir el archivo JSON anterior (hexadecimal) al formato CBOR"""
     
-    if not os.path.exists(CREDENTIALS_FILE):
-        logger.info("📄 Archivo de credenciales no existe, generando...")
-        return generate_and_save_credentials()
+    with open(LEGACY_CREDENTIALS_FILE, 'r') as f:
+        legacy = json.load(f)
+    
+    credentials = {
+        role: {field: bytes.fromhex(value) for field, value in entry.items()}
+        for role, entry in legacy.items()
+    }
+    logger.info(f"🔄 Migrando credenciales desde {LEGACY_CREDENTIALS_FILE}")
+    save_credentials(credentials)
+    return credentials
+
+def read_credentials():
+    """Leer credenciales desde archivo (generándolas o migrándolas si hace falta)"""
     
     try:
-        with open(CREDENTIALS_FILE, 'r') as f:
-            credentials = json.load(f)
+        if not os.path.exists(CREDENTIALS_FILE):
+            if os.path.exists(LEGACY_CREDENTIALS_FILE):
+                return migrate_legacy_credentials()
+            logger.info("📄 Archivo de credenciales no existe, generando...")
+            return generate_and_save_credentials()
+        
+        with open(CREDENTIALS_FILE, 'rb') as f:
+            credentials = cbor2.loads(f.read())
         logger.info("✅ Credenciales cargadas desde archivo")
         return credentials
     except Exception as e:
@@ -88,6 +170,87 @@ def load_credentials():
         logger.info("🔄 Regenerando credenciales...")
         return generate_and_save_credentials()
 
+# Copia en memoria de las credenciales, válida mientras el archivo no cambie
+CREDENTIALS_CACHE = {'mtime': None, 'data': None}
+
+def load_credentials():
+    """Cargar credenciales, reutilizando la copia en memoria si el archivo no ha cambiado"""
+    
+    try:
+        mtime = os.stat(CREDENTIALS_FILE).st_mtime_ns
+    except OSError:
+        mtime = None
+    if mtime is not None and mtime == CREDENTIALS_CACHE['mtime']:
+        return CREDENTIALS_CACHE['data']
+    
+    credentials = read_credentials()
+    try:
+        CREDENTIALS_CACHE['mtime'] = os.stat(CREDENTIALS_FILE).st_mtime_ns
+    except OSError:
+        CREDENTIALS_CACHE['mtime'] = None
+    CREDENTIALS_CACHE['data'] = credentials
+    # Los contextos creados con las credenciales anteriores dejan de ser válidos
+    GROUP_CONTEXTS.clear()
+    return credentials
+
+# Material de claves de un rol del grupo
+KeyMaterial = namedtuple('KeyMaterial', ['sender_id', 'private_key', 'sender_cred', 'peers', 'gm_cred'])
+
+def load_key_material(is_client=True):
+    """Seleccionar las credenciales necesarias para un rol"""
+    
+    creds = load_credentials()
+    
+    if is_client:
+        # El cliente conoce al servidor
+        own, peer = 'client', 'server'
+        sender_id, peer_id = GROUP_CONFIG['client_id'], GROUP_CONFIG['server_id']
+    else:
+        # El servidor conoce al cliente
+        own, peer = 'server', 'client'
+        sender_id, peer_id = GROUP_CONFIG['server_id'], GROUP_CONFIG['client_id']
+    
+    return KeyMaterial(
+        sender_id=sender_id,
+        private_key=creds[own]['private_key'],
+        sender_cred=creds[own]['credential'],
+        peers={peer_id: creds[peer]['credential']},
+        gm_cred=creds['group_manager']['credential']
+    )
+
+# ==================== BACKEND CRIPTOGRÁFICO ====================
+
+def check_crypto_backend():
+    """Comprobar que AES-GCM (A128GCM) usará aceleración por hardware
+    
+    aiocoap cifra con AESGCM de cryptography, que delega en OpenSSL
+    (EVP_aes_128_gcm con AES-NI + PCLMULQDQ en x86-64, o AES + PMULL en ARMv8)
+    """
+    
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives.ciphers import algorithms, modes
+    backend = default_backend()
+    logger.info(f"🔐 AES-GCM vía cryptography: {backend.openssl_version_text()}")
+    
+    if not backend.cipher_supported(algorithms.AES(bytes(ALG_AEAD.key_bytes)), modes.GCM(bytes(12))):
+        logger.warning("⚠️ El OpenSSL enlazado no ofrece AES-128-GCM")
+    
+    # aiocoap codifica en CBOR el AAD de cada mensaje protegido
+    if not isinstance(cbor2.loads, types.BuiltinFunctionType):
+        logger.warning("⚠️ cbor2 sin extensión compilada: la codificación CBOR será más lenta")
+    
+    try:
+        with open('/proc/cpuinfo') as f:
+            cpu_flags = set()
+            for line in f:
+                if line.startswith(('flags', 'Features')):
+                    cpu_flags.update(line.split(':', 1)[1].split())
+    except OSError:
+        return  # Fuera de Linux no se puede comprobar
+    
+    if 'aes' not in cpu_flags or not cpu_flags & {'pclmulqdq', 'pmull'}:
+        logger.warning("⚠️ CPU sin AES-NI/PCLMULQDQ: AES-GCM se ejecutará en software")
+
 # ==================== CONTEXTO CORREGIDO ====================
 
 class FixedGroupContext(SimpleGroupContext):
@@ -97,14 +260,15 @@ class FixedGroupContext(SimpleGroupContext):
         super().__init__(*args, **kwargs)
         
         # FIX 1: Agregar echo_recovery que falta en _GroupContextAspect
-        self.echo_recovery = secrets.token_bytes(8)
+        self.echo_recovery = os.urandom(8)
         
         # FIX 2: Inicializar replay windows correctamente
         for peer_id in self.peers:
             if peer_id in self.recipient_replay_windows:
                 # Inicializar replay window para cada peer
                 self.recipient_replay_windows[peer_id].initialize_empty()
-                logger.info(f"✅ Replay window inicializado para peer {peer_id.hex()}")
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info("✅ Replay window inicializado para peer %s", peer_id.hex())
     
     def pairwise_for(self, recipient_id):
         """Override para evitar el problema de pairwise mode
@@ -112,71 +276,51 @@ class FixedGroupContext(SimpleGroupContext):
         En lugar de crear _PairwiseContextAspect (que falla con None.staticstatic),
         devolvemos el contexto de grupo directamente para responses
         """
-        logger.info(f"🔄 Usando Group mode para response (evitando pairwise)")
+        request_logger.info("🔄 Usando Group mode para response (evitando pairwise)")
         return self  # Usar el contexto de grupo para responses también
 
+# Contextos ya creados, por (group_id, sender_id): se reutilizan durante todo
+# el proceso para no repetir la derivación de claves ni reiniciar los replay windows
+GROUP_CONTEXTS = {}
+
 def create_group_context(is_client=True):
     """Crear contexto OSCORE Group usando credenciales persistentes"""
     
-    # Cargar credenciales
-    creds = load_credentials()
-    
-    # Algoritmos
-    alg_aead = A128GCM()
-    alg_signature = Ed25519()
-    alg_group_enc = A128GCM()
-    alg_pairwise_key_agreement = None  # Simplificado
-    hashfun = hashfunctions["sha256"]
+    # Cargar credenciales (decodificadas y cacheadas)
+    material = load_key_material(is_client)
     
-    # Credenciales del group manager
-    gm_private_key = bytes.fromhex(creds['group_manager']['private_key'])
-    gm_cred = bytes.fromhex(creds['group_manager']['credential'])
-    
-    if is_client:
-        sender_id = GROUP_CONFIG['client_id']
-        private_key = bytes.fromhex(creds['client']['private_key'])
-        sender_cred = bytes.fromhex(creds['client']['credential'])
-        # El cliente conoce al servidor
-        peers = {
-            GROUP_CONFIG['server_id']: bytes.fromhex(creds['server']['credential'])
-        }
-    else:
-        sender_id = GROUP_CONFIG['server_id']
-        private_key = bytes.fromhex(creds['server']['private_key'])
-        sender_cred = bytes.fromhex(creds['server']['credential'])
-        # El servidor conoce al cliente
-        peers = {
-            GROUP_CONFIG['client_id']: bytes.fromhex(creds['client']['credential'])
-        }
+    sender_id = material.sender_id
+    cache_key = (GROUP_CONFIG['group_id'], sender_id)
+    if cache_key in GROUP_CONTEXTS:
+        return GROUP_CONTEXTS[cache_key]
     
     try:
         context = FixedGroupContext(
-            alg_aead=alg_aead,
-            hashfun=hashfun,
-            alg_signature=alg_signature,
-            alg_group_enc=alg_group_enc,
-            alg_pairwise_key_agreement=alg_pairwise_key_agreement,
+            alg_aead=ALG_AEAD,
+            hashfun=HASHFUN,
+            alg_signature=ALG_SIGNATURE,
+            alg_group_enc=ALG_GROUP_ENC,
+            alg_pairwise_key_agreement=None,  # Simplificado
             group_id=GROUP_CONFIG['group_id'],
             master_secret=GROUP_CONFIG['master_secret'],
             master_salt=GROUP_CONFIG['master_salt'],
             sender_id=sender_id,
-            private_key=private_key,
-            sender_auth_cred=sender_cred,
-            peers=peers,
-            group_manager_cred=gm_cred
+            private_key=material.private_key,
+            sender_auth_cred=material.sender_cred,
+            peers=dict(material.peers),
+            group_manager_cred=material.gm_cred
         )
         
-        logger.info(f"✅ Contexto {'cliente' if is_client else 'servidor'} creado")
-        logger.info(f"   Sender ID: {sender_id.hex()}")
-        logger.info(f"   Group ID: {GROUP_CONFIG['group_id'].hex()}")
-        logger.info(f"   Echo recovery: {context.echo_recovery.hex()}")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("✅ Contexto %s creado\n   Sender ID: %s\n   Group ID: %s\n   Echo recovery: %s",
+                        'cliente' if is_client else 'servidor', sender_id.hex(),
+                        GROUP_CONFIG['group_id'].hex(), context.echo_recovery.hex())
         
+        GROUP_CONTEXTS[cache_key] = context
         return context
         
     except Exception as e:
-        logger.error(f"❌ Error creando contexto: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("❌ Error creando contexto: %r", e, exc_info=DEBUG)
         return None
 
 # ==================== SERVIDOR ====================
@@ -184,28 +328,35 @@ def create_group_context(is_client=True):
 class GroupOscoreResource(Resource):
     """Recurso del servidor OSCORE Group"""
     
+    # Prefijos de respuesta ya codificados; el payload del cliente se añade tal cual
+    GET_PREFIX = "¡SUCCESS! OSCORE Group Server received: ".encode('utf-8')
+    POST_PREFIX = "¡PROCESSED! OSCORE Group Server processed: ".encode('utf-8')
+    
     async def render_get(self, request):
-        logger.info("🎉 ¡Servidor desprotegió GET request OSCORE Group exitosamente!")
-        logger.info(f"   Remote: {request.remote}")
-        logger.info(f"   Payload: {request.payload}")
-        logger.info(f"   URI Path: {getattr(request.opt, 'uri_path', 'N/A')}")
-        logger.info("   ✅ Cifrado, firma y autenticación verificados correctamente")
+        if request_logger.isEnabledFor(logging.INFO):
+            request_logger.info(
+                "🎉 ¡Servidor desprotegió GET request OSCORE Group exitosamente!\n"
+                "   Remote: %s\n   Payload: %s\n   URI Path: %s\n"
+                "   ✅ Cifrado, firma y autenticación verificados correctamente",
+                request.remote, request.payload, getattr(request.opt, 'uri_path', 'N/A'))
         
-        response_text = f"¡SUCCESS! OSCORE Group Server received: {request.payload.decode('utf-8', errors='ignore')}"
-        return Message(payload=response_text.encode('utf-8'), code=CONTENT)
+        return Message(payload=self.GET_PREFIX + request.payload, code=CONTENT)
 
     async def render_post(self, request):
-        logger.info("🎉 ¡Servidor desprotegió POST request OSCORE Group exitosamente!")
-        logger.info(f"   Remote: {request.remote}")
-        logger.info(f"   Payload: {request.payload}")
-        logger.info(f"   URI Path: {getattr(request.opt, 'uri_path', 'N/A')}")
-        logger.info("   ✅ Cifrado, firma y autenticación verificados correctamente")
+        if request_logger.isEnabledFor(logging.INFO):
+            request_logger.info(
+                "🎉 ¡Servidor desprotegió POST request OSCORE Group exitosamente!\n"
+                "   Remote: %s\n   Payload: %s\n   URI Path: %s\n"
+                "   ✅ Cifrado, firma y autenticación verificados correctamente",
+                request.remote, request.payload, getattr(request.opt, 'uri_path', 'N/A'))
         
-        response_text = f"¡PROCESSED! OSCORE Group Server processed: {request.payload.decode('utf-8', errors='ignore')}"
-        return Message(payload=response_text.encode('utf-8'), code=CHANGED)
+        return Message(payload=self.POST_PREFIX + request.payload, code=CHANGED)
 
-async def run_server(port=5683):
-    """Ejecutar servidor OSCORE Group"""
+async def run_server(port=5683, ready=None):
+    """Ejecutar servidor OSCORE Group
+    
+    Si se pasa un asyncio.Event en ready, se activa cuando el servidor ya escucha
+    """
     
     logger.info("🚀 Iniciando servidor OSCORE Group...")
     
@@ -231,9 +382,7 @@ async def run_server(port=5683):
         wrapped_site = OscoreSiteWrapper(root, server_credentials)
         logger.info("✅ Sitio envuelto con OSCORE Group")
     except Exception as e:
-        logger.error(f"❌ Error envolviendo sitio: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("❌ Error envolviendo sitio: %r", e, exc_info=DEBUG)
         return
     
     # Crear contexto del servidor
@@ -242,6 +391,8 @@ async def run_server(port=5683):
             bind=('localhost', port),
             site=wrapped_site
         )
+        if ready is not None:
+            ready.set()
         
         logger.info(f"🌐 Servidor OSCORE Group ejecutándose en puerto {port}")
         logger.info("🎉 ¡Servidor COMPLETAMENTE FUNCIONAL!")
@@ -265,12 +416,25 @@ async def run_server(port=5683):
             logger.error("❌ Puerto 5683 ya está en uso.")
             logger.info("💡 Cambia el puerto con --port 5684 o detén el otro servidor")
         else:
-            logger.error(f"❌ Error iniciando servidor: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.error("❌ Error iniciando servidor: %r", e, exc_info=DEBUG)
 
 # ==================== CLIENTE ====================
 
+async def wait_for_server(context, client_context, server_uri, attempts=20, timeout=0.5):
+    """Sondear /status con un request protegido hasta que el servidor responda"""
+    
+    for _ in range(attempts):
+        probe = Message(code=GET)
+        probe.opt.uri_path = ["status"]
+        protected_probe, _ = client_context.protect(probe)
+        protected_probe.set_request_uri(server_uri)
+        try:
+            await asyncio.wait_for(context.request(protected_probe).response, timeout)
+            return True
+        except Exception:
+            await asyncio.sleep(0.05)
+    return False
+
 async def run_client(server_host='localhost', server_port=5683):
     """Ejecutar cliente OSCORE Group"""
     
@@ -287,8 +451,12 @@ async def run_client(server_host='localhost', server_port=5683):
         context = await Context.create_client_context()
         logger.info("✅ Cliente OSCORE Group configurado")
         
-        # Esperar para asegurar conexión
-        await asyncio.sleep(2)
+        # URI del servidor, común a todos los requests protegidos
+        server_uri = f"coap://{server_host}:{server_port}/"
+        
+        # Confirmar que el servidor responde antes de empezar (sin esperas fijas)
+        if not await wait_for_server(context, client_context, server_uri):
+            logger.warning("⚠️ El servidor no respondió al sondeo inicial")
         
         logger.info("📡 Enviando requests protegidos con OSCORE Group...")
         logger.info("🔍 Monitorea Wireshark para ver tráfico bidireccional cifrado!")
@@ -307,18 +475,18 @@ async def run_client(server_host='localhost', server_port=5683):
         protected_request, request_id = client_context.protect(original_request)
         
         # Establecer URI para el request protegido
-        protected_request.set_request_uri(f"coap://{server_host}:{server_port}/")
+        protected_request.set_request_uri(server_uri)
         
-        logger.info(f"🔐 Request protegido:")
-        logger.info(f"   OSCORE option: {protected_request.opt.oscore.hex()}")
-        logger.info(f"   Payload cifrado: {len(protected_request.payload)} bytes (incluye firma)")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("🔐 Request protegido:\n   OSCORE option: %s\n"
+                        "   Payload cifrado: %d bytes (incluye firma)",
+                        protected_request.opt.oscore.hex(), len(protected_request.payload))
         
         try:
             # Enviar request protegido
             response = await context.request(protected_request).response
-            logger.info(f"✅ Response recibido del servidor:")
-            logger.info(f"   Código: {response.code}")
-            logger.info(f"   Tamaño: {len(response.payload)} bytes")
+            logger.info("✅ Response recibido del servidor:\n   Código: %s\n   Tamaño: %d bytes",
+                        response.code, len(response.payload))
             
             # Verificar si es exitoso
             if response.code.is_successful():
@@ -328,9 +496,10 @@ async def run_client(server_host='localhost', server_port=5683):
                 try:
                     # Para responses, necesitamos el contexto apropiado
                     from aiocoap.oscore import verify_start
-                    if response.opt.oscore:
-                        logger.info(f"   Response OSCORE option: {response.opt.oscore.hex()}")
-                        logger.info("   ✅ Response también está protegido con OSCORE Group")
+                    if response.opt.oscore and logger.isEnabledFor(logging.INFO):
+                        logger.info("   Response OSCORE option: %s\n"
+                                    "   ✅ Response también está protegido con OSCORE Group",
+                                    response.opt.oscore.hex())
                 except:
                     pass
             else:
@@ -339,8 +508,6 @@ async def run_client(server_host='localhost', server_port=5683):
         except Exception as e:
             logger.error(f"❌ Error en GET request: {e}")
         
-        await asyncio.sleep(1)
-        
         # ===== TEST 2: POST Request =====
         logger.info("\n📤 TEST 2: POST request manual a /api/data")
         
@@ -351,17 +518,16 @@ async def run_client(server_host='localhost', server_port=5683):
         original_post.opt.uri_path = ["api", "data"]
         
         protected_post, post_request_id = client_context.protect(original_post)
-        protected_post.set_request_uri(f"coap://{server_host}:{server_port}/")
+        protected_post.set_request_uri(server_uri)
         
-        logger.info(f"🔐 POST protegido:")
-        logger.info(f"   OSCORE option: {protected_post.opt.oscore.hex()}")
-        logger.info(f"   Payload cifrado: {len(protected_post.payload)} bytes")
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("🔐 POST protegido:\n   OSCORE option: %s\n   Payload cifrado: %d bytes",
+                        protected_post.opt.oscore.hex(), len(protected_post.payload))
         
         try:
             post_response = await context.request(protected_post).response
-            logger.info(f"✅ POST Response recibido:")
-            logger.info(f"   Código: {post_response.code}")
-            logger.info(f"   Tamaño: {len(post_response.payload)} bytes")
+            logger.info("✅ POST Response recibido:\n   Código: %s\n   Tamaño: %d bytes",
+                        post_response.code, len(post_response.payload))
             
             if post_response.code.is_successful():
                 logger.info("🎉 ¡POST OSCORE Group exitoso!")
@@ -369,34 +535,36 @@ async def run_client(server_host='localhost', server_port=5683):
         except Exception as e:
             logger.error(f"❌ Error en POST request: {e}")
         
-        await asyncio.sleep(1)
-        
         # ===== TEST 3: Múltiples requests =====
         logger.info("\n📤 TEST 3: Múltiples requests para generar tráfico intenso")
         successful_requests = 0
         
-        for i in range(5):
-            test_message = Message(
-                code=GET,
-                payload=f"OSCORE Group test message #{i+1}".encode()
-            )
-            test_message.opt.uri_path = ["test"]
+        # La ruta se comparte entre mensajes; sólo cambia el payload
+        test_path = ["test"]
+        test_messages = [
+            Message(code=GET, payload=f"OSCORE Group test message #{i+1}".encode('ascii'))
+            for i in range(5)
+        ]
+        
+        # Todos los requests en vuelo a la vez sobre el mismo Context
+        pending_responses = []
+        for test_message in test_messages:
+            test_message.opt.uri_path = test_path
             
             protected_test, test_req_id = client_context.protect(test_message)
-            protected_test.set_request_uri(f"coap://{server_host}:{server_port}/")
-            
-            try:
-                test_response = await context.request(protected_test).response
-                if test_response.code.is_successful():
-                    successful_requests += 1
-                    logger.info(f"✅ Test {i+1}: EXITOSO ({len(test_response.payload)} bytes)")
-                else:
-                    logger.warning(f"⚠️ Test {i+1}: Response con error {test_response.code}")
-                    
-            except Exception as e:
-                logger.error(f"❌ Test {i+1}: {e}")
-            
-            await asyncio.sleep(0.5)
+            protected_test.set_request_uri(server_uri)
+            pending_responses.append(context.request(protected_test).response)
+        
+        test_responses = await asyncio.gather(*pending_responses, return_exceptions=True)
+        
+        for i, test_response in enumerate(test_responses):
+            if isinstance(test_response, Exception):
+                logger.error("❌ Test %d: %s", i + 1, test_response)
+            elif test_response.code.is_successful():
+                successful_requests += 1
+                logger.info("✅ Test %d: EXITOSO (%d bytes)", i + 1, len(test_response.payload))
+            else:
+                logger.warning("⚠️ Test %d: Response con error %s", i + 1, test_response.code)
         
         # ===== RESUMEN FINAL =====
         logger.info(f"\n🎊 RESUMEN FINAL:")
@@ -414,9 +582,7 @@ async def run_client(server_host='localhost', server_port=5683):
         logger.info("   🔍 Comunicación bidireccional client↔server")
         
     except Exception as e:
-        logger.error(f"❌ Error en cliente: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("❌ Error en cliente: %r", e, exc_info=DEBUG)
     finally:
         if 'context' in locals():
             await context.shutdown()
@@ -425,29 +591,34 @@ async def run_client(server_host='localhost', server_port=5683):
 
 def reset_credentials():
     """Eliminar credenciales para regenerarlas"""
-    if os.path.exists(CREDENTIALS_FILE):
-        os.remove(CREDENTIALS_FILE)
+    CREDENTIALS_CACHE.update(mtime=None, data=None)
+    GROUP_CONTEXTS.clear()
+    existing = [path for path in (CREDENTIALS_FILE, LEGACY_CREDENTIALS_FILE) if os.path.exists(path)]
+    if existing:
+        for path in existing:
+            os.remove(path)
         logger.info(f"🗑️ Credenciales eliminadas. Se regenerarán en la próxima ejecución.")
     else:
         logger.info("❌ No hay credenciales para eliminar.")
 
 def show_credentials_info():
     """Mostrar información de las credenciales"""
-    if not os.path.exists(CREDENTIALS_FILE):
+    # Sólo se consulta el stat del archivo: los IDs mostrados salen de GROUP_CONFIG
+    path = CREDENTIALS_FILE if os.path.exists(CREDENTIALS_FILE) else LEGACY_CREDENTIALS_FILE
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
         logger.info("❌ No hay credenciales guardadas.")
         return
     
-    try:
-        creds = load_credentials()
-        logger.info("📋 INFORMACIÓN DE CREDENCIALES OSCORE GROUP:")
-        logger.info(f"   Group ID: {GROUP_CONFIG['group_id'].hex()}")
-        logger.info(f"   Cliente ID: {GROUP_CONFIG['client_id'].hex()}")
-        logger.info(f"   Servidor ID: {GROUP_CONFIG['server_id'].hex()}")
-        logger.info(f"   Master Secret: {GROUP_CONFIG['master_secret'].hex()}")
-        logger.info(f"   Master Salt: {GROUP_CONFIG['master_salt'].hex()}")
-        logger.info("   ✅ Credenciales válidas para OSCORE Group")
-    except Exception as e:
-        logger.error(f"❌ Error leyendo credenciales: {e}")
+    logger.info("📋 INFORMACIÓN DE CREDENCIALES OSCORE GROUP:")
+    logger.info("   Archivo: %s (%d bytes, modificado %s)", path, st.st_size,
+                time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(st.st_mtime)))
+    logger.info(f"   Group ID: {GROUP_CONFIG['group_id'].hex()}")
+    logger.info(f"   Cliente ID: {GROUP_CONFIG['client_id'].hex()}")
+    logger.info(f"   Servidor ID: {GROUP_CONFIG['server_id'].hex()}")
+    logger.info(f"   Master Secret: {GROUP_CONFIG['master_secret'].hex()}")
+    logger.info(f"   Master Salt: {GROUP_CONFIG['master_salt'].hex()}")
 
 # ==================== DEMO COMPLETO ====================
 
@@ -486,10 +657,10 @@ async def run_demo():
     
     # Proteger
     protected, req_id = client_ctx.protect(original)
-    logger.info(f"🔒 Mensaje protegido:")
-    logger.info(f"   OSCORE option: {protected.opt.oscore.hex()}")
-    logger.info(f"   Payload cifrado: {len(protected.payload)} bytes")
-    logger.info(f"   Incluye firma digital Ed25519: ✅")
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("🔒 Mensaje protegido:\n   OSCORE option: %s\n   Payload cifrado: %d bytes\n"
+                    "   Incluye firma digital Ed25519: ✅",
+                    protected.opt.oscore.hex(), len(protected.payload))
     
     logger.info("\n🎉 ¡Demo completado! OSCORE Group funcionando perfectamente.")
 
@@ -503,18 +674,29 @@ async def main():
                        help='Modo: server, client, demo, reset (credenciales), info')
     parser.add_argument('--port', type=int, default=5683, help='Puerto del servidor')
     parser.add_argument('--host', default='localhost', help='Host del servidor')
+    parser.add_argument('--verbose', action='store_true',
+                       help='Registrar el detalle de cada request recibido por el servidor')
+    parser.add_argument('--quiet', action='store_true',
+                       help='Mostrar sólo avisos y errores')
     
     args = parser.parse_args()
     
+    if args.verbose:
+        request_logger.setLevel(logging.INFO)
+    if args.quiet:
+        logger.setLevel(logging.WARNING)
+    
     if args.mode == 'reset':
         reset_credentials()
         return
     elif args.mode == 'info':
         show_credentials_info()
         return
-    elif args.mode == 'demo':
+    
+    check_crypto_backend()
+    
+    if args.mode == 'demo':
         await run_demo()
-        return
     elif args.mode == 'server':
         logger.info("🖥️ Modo: SERVIDOR OSCORE GROUP")
         await run_server(args.port)
@@ -532,7 +714,8 @@ if __name__ == "__main__":
     print("="*60)
     
     try:
-        asyncio.run(main())
+        # Bucle de eventos más eficiente disponible (uringcore/uvloop)
+        coap_common.run(main())
     except KeyboardInterrupt:
         print("\n🛑 Programa interrumpido")
     except Exception as e:
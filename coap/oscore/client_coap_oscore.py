@@ -1,4 +1,6 @@
+import argparse
 import asyncio
+import sys
 import time
 import statistics
 import psutil
@@ -7,7 +9,14 @@ import json
 from aiocoap import Context, Message, GET
 from aiocoap.credentials import CredentialsMap
 
-async def run_requests():
+# coap_common.py está en coap/, un nivel por encima de este script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import coap_common
+
+NUM_REQUESTS = 100
+CONCURRENCY = 64  # Solicitudes en vuelo simultáneamente (solo con --concurrent)
+
+async def run_requests(concurrent=False):
     latencias = []
 
     process = psutil.Process(os.getpid())
@@ -24,33 +33,68 @@ async def run_requests():
     context = await Context.create_client_context()
     context.client_credentials = credentials  # 🔑 Importante: se asignan
 
-    for _ in range(100):
+    # La URI se analiza una sola vez; cada solicitud reutiliza destino y ruta
+    plantilla = Message(code=GET, uri='coap://127.0.0.1/hola')
+
+    # Limita las solicitudes en vuelo para no agotar los Message ID
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def enviar_solicitud():
         t1 = time.perf_counter()
 
-        request = Message(code=GET, uri='coap://127.0.0.1/hola')
+        request = Message(code=GET)
+        request.opt.uri_path = plantilla.opt.uri_path
+        request.remote = plantilla.remote
         try:
             response = await context.request(request).response
             # print(response.payload)  # opcional
         except Exception as e:
             print("Error:", e)
-            continue
+            return
 
         t2 = time.perf_counter()
         latencias.append(t2 - t1)
-        await asyncio.sleep(0.05)
+
+    async def enviar_solicitud_limitada():
+        async with semaphore:
+            await enviar_solicitud()
+
+    inicio_total = time.perf_counter()
+    if concurrent:
+        # aiocoap deja en cola (NSTART=1) las solicitudes a un mismo destino,
+        # así que el tiempo de cada una incluye esa espera: solo se informa
+        # del rendimiento
+        await asyncio.gather(*(enviar_solicitud_limitada() for _ in range(NUM_REQUESTS)))
+    else:
+        # Una solicitud tras otra: cada latencia es un viaje de ida y vuelta
+        for _ in range(NUM_REQUESTS):
+            await enviar_solicitud()
+    tiempo_total = time.perf_counter() - inicio_total
 
     cpu_user_end, cpu_sys_end = process.cpu_times().user, process.cpu_times().system
     io_end = process.io_counters()
     mem_info_end = process.memory_info()
 
     print("\n--- Resultados ---")
+    print(f"Modo: {f'concurrente ({CONCURRENCY} en vuelo)' if concurrent else 'secuencial'}")
     print(f"Número de solicitudes: {len(latencias)}")
-    print(f"Latencia media: {statistics.mean(latencias):.4f} s")
-    print(f"Desviación estándar: {statistics.stdev(latencias):.4f} s")
+    print(f"Tiempo total: {tiempo_total:.2f} s")
+    print(f"Rendimiento: {len(latencias) / tiempo_total:.2f} solicitudes/s")
+    if concurrent:
+        print("Latencia: no se mide en modo concurrente (incluye la espera en cola)")
+    else:
+        print(f"Latencia media: {statistics.mean(latencias):.4f} s")
+        print(f"Desviación estándar: {statistics.stdev(latencias):.4f} s")
     print(f"CPU modo usuario: {cpu_user_end - cpu_user_start:.4f} s")
     print(f"CPU modo sistema: {cpu_sys_end - cpu_sys_start:.4f} s")
     print(f"Lecturas de disco: {io_end.read_count - io_start.read_count}")
     print(f"Escrituras de disco: {io_end.write_count - io_start.write_count}")
     print(f"Memoria residente total (RSS): {mem_info_end.rss / 1024**2:.2f} MB")
 
-asyncio.run(run_requests())
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Cliente CoAP con OSCORE (benchmark)')
+    parser.add_argument('--concurrent', action='store_true',
+                        help=f'Mantener hasta {CONCURRENCY} solicitudes en vuelo (solo rendimiento, sin latencias)')
+    args = parser.parse_args()
+
+    coap_common.run(run_requests(args.concurrent))
@@ -1,4 +1,6 @@
 import asyncio
+import os
+import sys
 import logging
 import json
 from aiocoap import Context, Message
@@ -6,6 +8,10 @@ from aiocoap.resource import Site, Resource
 from aiocoap.credentials import CredentialsMap
 from aiocoap.oscore_sitewrapper import OscoreSiteWrapper
 
+# coap_common.py está en coap/, un nivel por encima de este script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import coap_common
+
 class RecursoSeguro(Resource):
     async def render_get(self, request):
         return Message(payload=b"Hola desde el servidor CoAP")
@@ -32,4 +38,4 @@ async def main():
     await asyncio.get_running_loop().create_future()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    coap_common.run(main())
@@ -1,3 +1,4 @@
+import argparse
 import paho.mqtt.client as mqtt
 import time
 import psutil
@@ -5,29 +6,42 @@ import statistics
 import tracemalloc
 import os
 import threading
+from collections import deque
 
 NUM_MESSAGES = 100
 BROKER = "127.0.0.1"
 PORT = 1883  # cambia a 8883 si usas TLS
 TOPIC = "hola"
+EXPECTED_PAYLOAD = b"Hola desde el cliente MQTT"
+WAIT_TIMEOUT = 5  # s máximos de espera por suscripción y recepción
 latencies = []
+subscribed = threading.Event()
+received = threading.Event()  # Llegada de cada mensaje (modo secuencial)
+all_received = threading.Event()
 
 def on_message(client, userdata, msg):
     recv_time = time.perf_counter()
-    if msg.payload.decode() == "Hola desde el cliente MQTT":
-        latency = (recv_time - timestamps.pop(0)) * 1000  # ms
+    if msg.payload == EXPECTED_PAYLOAD:
+        latency = (recv_time - timestamps.popleft()) * 1000  # ms
         latencies.append(latency)
+        received.set()
+        if len(latencies) == NUM_MESSAGES:
+            all_received.set()
+
+def on_subscribe(client, userdata, mid, granted_qos):
+    subscribed.set()
 
 def mqtt_subscriber():
     client = mqtt.Client()
     client.on_message = on_message
+    client.on_subscribe = on_subscribe
     client.connect(BROKER, PORT, 60)
     client.subscribe(TOPIC)
     client.loop_forever()
 
-timestamps = []
+timestamps = deque()  # Instantes de publicación, en orden de envío
 
-def main():
+def main(concurrent=False):
     process = psutil.Process(os.getpid())
     cpu_start = process.cpu_times()
     io_start = process.io_counters()
@@ -36,17 +50,38 @@ def main():
     sub_thread = threading.Thread(target=mqtt_subscriber)
     sub_thread.daemon = True
     sub_thread.start()
-    time.sleep(1)  # Espera para que el subscriptor se conecte
+    # Se espera al SUBACK del broker en lugar de un tiempo fijo
+    if not subscribed.wait(WAIT_TIMEOUT):
+        print("Aviso: el subscriptor no confirmó la suscripción")
 
     pub_client = mqtt.Client()
     pub_client.connect(BROKER, PORT, 60)
+    # El hilo de red de paho envía la cola de salida
+    pub_client.loop_start()
 
-    for _ in range(NUM_MESSAGES):
-        timestamps.append(time.perf_counter())
-        pub_client.publish(TOPIC, "Hola desde el cliente MQTT")
-        time.sleep(0.01)  # Intervalo entre publicaciones
-
-    time.sleep(2)  # Espera para recibir todos los mensajes
+    total_start = time.perf_counter()
+    if concurrent:
+        # Las publicaciones QoS 0 se encadenan sin esperas, así que el tiempo
+        # de cada mensaje incluye la cola de los anteriores: solo se informa
+        # del rendimiento
+        for _ in range(NUM_MESSAGES):
+            timestamps.append(time.perf_counter())
+            pub_client.publish(TOPIC, EXPECTED_PAYLOAD, qos=0)
+        # Termina en cuanto llegan todos los mensajes (o al agotar el tiempo)
+        all_received.wait(WAIT_TIMEOUT)
+    else:
+        # Un mensaje tras otro: cada latencia es un viaje de ida y vuelta
+        # a través del broker
+        for _ in range(NUM_MESSAGES):
+            received.clear()
+            timestamps.append(time.perf_counter())
+            pub_client.publish(TOPIC, EXPECTED_PAYLOAD, qos=0)
+            if not received.wait(WAIT_TIMEOUT):
+                print("Aviso: mensaje no recibido a tiempo, se detiene el envío")
+                break
+    total_time = time.perf_counter() - total_start
+    pub_client.disconnect()
+    pub_client.loop_stop()
 
     cpu_end = process.cpu_times()
     io_end = process.io_counters()
@@ -54,9 +89,15 @@ def main():
     tracemalloc.stop()
 
     print("\n--- Resultados ---")
+    print(f"Modo: {'concurrente' if concurrent else 'secuencial'}")
     print(f"Número de mensajes recibidos: {len(latencies)}")
-    print(f"Latencia media: {statistics.mean(latencies):.2f} ms")
-    print(f"Desviación estándar: {statistics.stdev(latencies):.2f} ms")
+    print(f"Tiempo total: {total_time:.2f} s")
+    print(f"Rendimiento: {len(latencies) / total_time:.2f} mensajes/s")
+    if concurrent:
+        print("Latencia: no se mide en modo concurrente (incluye la espera en cola)")
+    else:
+        print(f"Latencia media: {statistics.mean(latencies):.2f} ms")
+        print(f"Desviación estándar: {statistics.stdev(latencies):.2f} ms")
     print(f"CPU modo usuario: {cpu_end.user - cpu_start.user:.2f} s")
     print(f"CPU modo sistema: {cpu_end.system - cpu_start.system:.2f} s")
     print(f"Lecturas de disco: {io_end.read_count - io_start.read_count}")
@@ -65,4 +106,9 @@ def main():
     print(f"Memoria residente total (RSS): {process.memory_info().rss / 1024:.2f} KB")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description='Cliente MQTT (benchmark)')
+    parser.add_argument('--concurrent', action='store_true',
+                        help='Publicar los mensajes sin esperas entre ellos (solo rendimiento, sin latencias)')
+    args = parser.parse_args()
+
+    main(args.concurrent)